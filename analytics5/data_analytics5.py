@@ -1,12 +1,20 @@
-import pandas as pd
 import sqlite3
 import plotly.express as px
-from scipy.stats import chi2_contingency
-from jinja2 import Environment
+import plotly.io as pio
+import kaleido
+from choreographer.browsers import Chromium
+import numpy as np
+from scipy.stats import chi2 as chi2_dist
 from docx import Document
-from weasyprint import HTML
-import base64
+from playwright.sync_api import sync_playwright
 import os
+import sys
+from pathlib import Path
+from urllib.parse import quote
+
+# survey_load lives at the repository root, shared with the draft scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from survey_load import get_df, write_html_with_embedded_file
 
 # === CONFIG ===
 EXCEL_FILE = "data.xlsx"
@@ -15,79 +23,115 @@ CHART_DIR = "charts"
 REPORT_HTML = "harassment_policy_report.html"
 REPORT_PDF = "harassment_policy_report.pdf"
 REPORT_DOCX = "executive_summary.docx"
-EMBED_XLSX = "survey_data.xlsx"
+EMBED_PLACEHOLDER = "__ENCODED_EXCEL__"
+# --standalone embeds the workbook in the report as a data URI instead of linking to it
+STANDALONE = "--standalone" in sys.argv[1:]
 
 # === LOAD DATA ===
-df = pd.read_excel(EXCEL_FILE)
-df.columns = [c.strip().replace(" ", "_").replace("?", "").replace(",", "").replace("/", "_") for c in df.columns]
-df.to_excel(EMBED_XLSX, index=False)
-
-# Base64-encoded original data for embedding
-with open(EMBED_XLSX, "rb") as f:
-    encoded_excel = base64.b64encode(f.read()).decode()
+df = get_df(EXCEL_FILE)
 
 os.makedirs(CHART_DIR, exist_ok=True)
 
 # === CONVERT TO SQLITE ===
 conn = sqlite3.connect(DB_FILE)
-df.to_sql("survey", conn, if_exists="replace", index=False)
+# The survey table is rebuilt on every run, so skip journaling and fsyncs for the bulk load
+conn.executescript("PRAGMA journal_mode=MEMORY; PRAGMA synchronous=OFF; PRAGMA temp_store=MEMORY; PRAGMA cache_size=-65536;")
+# Multi-row INSERTs in one transaction; SQLite caps a statement at 999 bound parameters
+with conn:
+    df.to_sql("survey", conn, if_exists="replace", index=False,
+              method="multi", chunksize=max(1, 999 // len(df.columns)))
 
 # === ANALYSIS & CHARTS ===
 
-def plot_and_save(df, title, filename, x, y='Count', color=None):
+def build_chart(df, title, filename, x, y='Count', color=None):
+    # Only builds the figure; all charts are exported to PNG together once the analyses finish
     fig = px.bar(df, x=x, y=y, color=color, barmode="group", text_auto=True, title=title)
     chart_path = os.path.join(CHART_DIR, filename)
-    fig.write_html(chart_path)
-    return chart_path
-
-def chi_square_test(df, col1, col2):
-    contingency = pd.crosstab(df[col1], df[col2])
+    return chart_path, fig
+
+def chi2_statistic(observed):
+    # Pearson's chi-square on a small contingency array, Yates-corrected for 1 dof like scipy's chi2_contingency
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    diff = np.abs(observed - expected)
+    if dof == 1:
+        diff = np.maximum(diff - 0.5, 0.0)
+    chi2 = (diff ** 2 / expected).sum()
+    p = chi2_dist.sf(chi2, dof) if dof > 0 else 1.0
+    return chi2, p, dof
+
+def chi_square_from_counts(counts_df, row, col, val='Count'):
+    # Pivot the already-aggregated group counts into the contingency table instead of re-scanning df
+    contingency = counts_df.pivot(index=row, columns=col, values=val).fillna(0)
     
     # Check if contingency table is empty
     if contingency.empty:
-        return f"Chi-square test between '{col1}' and '{col2}': No data available for chi-square test.", None
+        return f"Chi-square test between '{row}' and '{col}': No data available for chi-square test.", None
     
-    chi2, p, dof, expected = chi2_contingency(contingency)
-    return f"Chi-square test between '{col1}' and '{col2}': χ² = {chi2:.2f}, p = {p:.4f} (dof={dof})", p
+    chi2, p, dof = chi2_statistic(contingency.values.astype(np.float64))
+    return f"Chi-square test between '{row}' and '{col}': χ² = {chi2:.2f}, p = {p:.4f} (dof={dof})", p
 
 # 1. Awareness Levels
-awareness_df = df['Are_you_aware_of_what_constitutes_workplace_harassment'].value_counts().reset_index()
-awareness_df.columns = ['Awareness', 'Count']
-chart_awareness = plot_and_save(awareness_df, "Awareness of Workplace Harassment", "awareness.html", x='Awareness')
+def analyze_awareness():
+    awareness_df = df['Are_you_aware_of_what_constitutes_workplace_harassment'].value_counts().reset_index()
+    awareness_df.columns = ['Awareness', 'Count']
+    chart_awareness, fig_awareness = build_chart(awareness_df, "Awareness of Workplace Harassment", "awareness.png", x='Awareness')
+    return awareness_df, chart_awareness, fig_awareness
 
 # 2. Awareness vs Reporting
-awareness_reporting_df = df.groupby(['Are_you_aware_of_what_constitutes_workplace_harassment',
-                                     'Do_you_know_whom_to_report_workplace_harassment_incidents_to']).size().reset_index(name='Count')
-awareness_reporting_df.columns = ['Awareness', 'Know_Whom', 'Count']
-chart_awareness_reporting = plot_and_save(awareness_reporting_df, "Awareness vs Reporting Knowledge", "awareness_reporting.html", x='Awareness', color='Know_Whom')
-chi_awareness_reporting, p1 = chi_square_test(df, 'Are_you_aware_of_what_constitutes_workplace_harassment',
-                                               'Do_you_know_whom_to_report_workplace_harassment_incidents_to')
+def analyze_awareness_reporting():
+    awareness_reporting_df = df.groupby(['Are_you_aware_of_what_constitutes_workplace_harassment',
+                                         'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], observed=True).size().reset_index(name='Count')
+    awareness_reporting_df.columns = ['Awareness', 'Know_Whom', 'Count']
+    chart_awareness_reporting, fig_awareness_reporting = build_chart(awareness_reporting_df, "Awareness vs Reporting Knowledge", "awareness_reporting.png", x='Awareness', color='Know_Whom')
+    chi_awareness_reporting, p1 = chi_square_from_counts(awareness_reporting_df, 'Awareness', 'Know_Whom')
+    return awareness_reporting_df, chart_awareness_reporting, fig_awareness_reporting, chi_awareness_reporting, p1
 
 # 3. Training vs Reporting
-training_reporting_df = df.groupby(['Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
-                                    'Do_you_know_whom_to_report_workplace_harassment_incidents_to']).size().reset_index(name='Count')
-training_reporting_df.columns = ['Training', 'Know_Whom', 'Count']
+def analyze_training_reporting():
+    training_reporting_df = df.groupby(['Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
+                                        'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], observed=True).size().reset_index(name='Count')
+    training_reporting_df.columns = ['Training', 'Know_Whom', 'Count']
 
-# Remove rows with missing data in columns for chi-square test
-training_reporting_df = training_reporting_df.dropna(subset=['Training', 'Know_Whom'])
+    # Remove rows with missing data in columns for chi-square test
+    training_reporting_df = training_reporting_df.dropna(subset=['Training', 'Know_Whom'])
 
-chart_training_reporting = plot_and_save(training_reporting_df, "Training vs Reporting Knowledge", "training_reporting.html", x='Training', color='Know_Whom')
-chi_training_reporting, p2 = chi_square_test(training_reporting_df, 
-                                              'Training',
-                                              'Know_Whom')
+    chart_training_reporting, fig_training_reporting = build_chart(training_reporting_df, "Training vs Reporting Knowledge", "training_reporting.png", x='Training', color='Know_Whom')
+    chi_training_reporting, p2 = chi_square_from_counts(training_reporting_df, 'Training', 'Know_Whom')
+    return training_reporting_df, chart_training_reporting, fig_training_reporting, chi_training_reporting, p2
 
 # 4. Gender-based Awareness
-gender_awareness_df = df.groupby(['What_is_your_Gender',
-                                  'Are_you_aware_of_what_constitutes_workplace_harassment']).size().reset_index(name='Count')
-gender_awareness_df.columns = ['Gender', 'Awareness', 'Count']
-chart_gender_awareness = plot_and_save(gender_awareness_df, "Gender-based Awareness", "gender_awareness.html", x='Gender', color='Awareness')
-chi_gender_awareness, p3 = chi_square_test(df, 'What_is_your_Gender',
-                                           'Are_you_aware_of_what_constitutes_workplace_harassment')
+def analyze_gender_awareness():
+    gender_awareness_df = df.groupby(['What_is_your_Gender',
+                                      'Are_you_aware_of_what_constitutes_workplace_harassment'], observed=True).size().reset_index(name='Count')
+    gender_awareness_df.columns = ['Gender', 'Awareness', 'Count']
+    chart_gender_awareness, fig_gender_awareness = build_chart(gender_awareness_df, "Gender-based Awareness", "gender_awareness.png", x='Gender', color='Awareness')
+    chi_gender_awareness, p3 = chi_square_from_counts(gender_awareness_df, 'Gender', 'Awareness')
+    return gender_awareness_df, chart_gender_awareness, fig_gender_awareness, chi_gender_awareness, p3
+
+awareness_df, chart_awareness, fig_awareness = analyze_awareness()
+awareness_reporting_df, chart_awareness_reporting, fig_awareness_reporting, chi_awareness_reporting, p1 = analyze_awareness_reporting()
+training_reporting_df, chart_training_reporting, fig_training_reporting, chi_training_reporting, p2 = analyze_training_reporting()
+gender_awareness_df, chart_gender_awareness, fig_gender_awareness, chi_gender_awareness, p3 = analyze_gender_awareness()
+
+# Kaleido drives its own Chrome (not Playwright's Chromium). Fetch one up front if none is installed,
+# so a missing browser fails here with an error instead of stalling the export
+if Chromium.find_browser(skip_local=False) is None:
+    kaleido.get_chrome_sync()
+
+# Export every chart in a single Kaleido call: one browser renders all four
+pio.write_images([fig_awareness, fig_awareness_reporting, fig_training_reporting, fig_gender_awareness],
+                 [chart_awareness, chart_awareness_reporting, chart_training_reporting, chart_gender_awareness],
+                 width=900, height=500)
 
 # === INTERPRETATION ===
+aware = df['Are_you_aware_of_what_constitutes_workplace_harassment'] == 'Yes'
+yes_n = int(aware.sum())
+yes_pct = aware.mean() * 100
+
 summary = f"""
 <strong>Executive Summary</strong><br>
-Of the {len(df)} respondents, {awareness_df[awareness_df['Awareness'] == 'Yes']['Count'].values[0]} ({awareness_df[awareness_df['Awareness'] == 'Yes']['Count'].values[0]/len(df)*100:.1f}%) are aware of what constitutes workplace harassment.<br>
+Of the {len(df)} respondents, {yes_n} ({yes_pct:.1f}%) are aware of what constitutes workplace harassment.<br>
 {chi_awareness_reporting}<br>
 {chi_training_reporting}<br>
 {chi_gender_awareness}
@@ -104,6 +148,8 @@ recommendations = """
 """
 
 # === GENERATE HTML REPORT ===
+dataset_href = "data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64," + EMBED_PLACEHOLDER if STANDALONE else quote(EXCEL_FILE)
+
 html_template = f"""
 <!DOCTYPE html>
 <html>
@@ -113,20 +159,20 @@ html_template = f"""
     body {{ font-family: Arial; margin: 40px; background: #f4f4f4; }}
     .section {{ background: #fff; padding: 20px; border-radius: 10px; margin-bottom: 30px; }}
     h1, h2 {{ color: #2c3e50; }}
-    iframe {{ width: 100%; height: 500px; border: none; }}
+    img {{ max-width: 100%; }}
   </style>
 </head>
 <body>
   <h1>Comprehensive Report on Workplace Harassment Policy Awareness</h1>
   <div class="section"><h2>1. Executive Summary</h2><p>{summary}</p></div>
 
-  <div class="section"><h2>2. Awareness Levels</h2><iframe src="{chart_awareness}"></iframe></div>
-  <div class="section"><h2>3. Awareness vs Reporting</h2><iframe src="{chart_awareness_reporting}"></iframe></div>
-  <div class="section"><h2>4. Training vs Reporting</h2><iframe src="{chart_training_reporting}"></iframe></div>
-  <div class="section"><h2>5. Gender-based Awareness</h2><iframe src="{chart_gender_awareness}"></iframe></div>
+  <div class="section"><h2>2. Awareness Levels</h2><img src="{chart_awareness}" alt="Awareness Levels Chart"></div>
+  <div class="section"><h2>3. Awareness vs Reporting</h2><img src="{chart_awareness_reporting}" alt="Awareness vs Reporting Chart"></div>
+  <div class="section"><h2>4. Training vs Reporting</h2><img src="{chart_training_reporting}" alt="Training vs Reporting Chart"></div>
+  <div class="section"><h2>5. Gender-based Awareness</h2><img src="{chart_gender_awareness}" alt="Gender-based Awareness Chart"></div>
 
   <div class="section"><h2>6. Download Dataset</h2>
-    <a download="SurveyData.xlsx" href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{encoded_excel}">Download Excel File</a>
+    <a download="SurveyData.xlsx" href="{dataset_href}">Download Excel File</a>
   </div>
 
   <div class="section"><h2>7. Recommendations</h2>{recommendations}</div>
@@ -134,11 +180,20 @@ html_template = f"""
 </html>
 """
 
-with open(REPORT_HTML, "w", encoding="utf-8") as f:
-    f.write(html_template)
+if STANDALONE:
+    write_html_with_embedded_file(REPORT_HTML, html_template, EMBED_PLACEHOLDER, EXCEL_FILE)
+else:
+    with open(REPORT_HTML, "w", encoding="utf-8") as f:
+        f.write(html_template)
 
 # === EXPORT TO PDF ===
-HTML(REPORT_HTML).write_pdf(REPORT_PDF)
+# Headless Chromium prints the report natively, chart images included
+with sync_playwright() as p:
+    browser = p.chromium.launch()
+    page = browser.new_page()
+    page.goto(Path(REPORT_HTML).absolute().as_uri())
+    page.pdf(path=REPORT_PDF, print_background=True)
+    browser.close()
 
 # === EXPORT TO DOCX ===
 doc = Document()
@@ -1,106 +1,77 @@
-import pandas as pd
-import sqlite3
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
 import os
+import multiprocessing
+from survey_load import get_df, nulls_first
 
-# Step 1: Load Excel data
+# Step 1: Load Excel data with cleaned column names
 file_path = "data.xlsx"
-df = pd.read_excel(file_path)
+df = get_df(file_path)
 
-# Step 2: Clean column names for SQL compatibility
-df.columns = [col.strip().replace(" ", "_").replace("?", "").replace(",", "").replace("(", "").replace(")", "").replace("/", "_") for col in df.columns]
-
-# Step 3: Create SQLite DB and insert data
-conn = sqlite3.connect("harassment_survey.db")
-df.to_sql("survey", conn, if_exists="replace", index=False)
-
-# Step 4: Run SQL Queries for Insights
+# Step 2: Aggregate responses for Insights
 
 # 1. Overall Awareness
-awareness_df = pd.read_sql_query("""
-    SELECT Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness, COUNT(*) AS Count
-    FROM survey
-    GROUP BY Awareness;
-""", conn)
+awareness_df = df.groupby('Are_you_aware_of_what_constitutes_workplace_harassment', dropna=False, observed=True).size().reset_index(name='Count')
+awareness_df.columns = ['Awareness', 'Count']
+awareness_df = nulls_first(awareness_df)
 
 # 2. Awareness vs Knowledge of Reporting
-awareness_reporting_df = pd.read_sql_query("""
-    SELECT 
-        Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-        Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom_To_Report,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Awareness, Know_Whom_To_Report;
-""", conn)
+awareness_reporting_df = df.groupby(['Are_you_aware_of_what_constitutes_workplace_harassment',
+                                     'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+awareness_reporting_df.columns = ['Awareness', 'Know_Whom_To_Report', 'Count']
+awareness_reporting_df = nulls_first(awareness_reporting_df)
 
 # 3. Training vs Reporting Knowledge
-training_reporting_df = pd.read_sql_query("""
-    SELECT 
-        Have_you_ever_received_any_formal_training_on_workplace_harassment_policies AS Training,
-        Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom_To_Report,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Training, Know_Whom_To_Report;
-""", conn)
+training_reporting_df = df.groupby(['Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
+                                    'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+training_reporting_df.columns = ['Training', 'Know_Whom_To_Report', 'Count']
+training_reporting_df = nulls_first(training_reporting_df)
 
 # 4. Gender-based Awareness
-gender_awareness_df = pd.read_sql_query("""
-    SELECT 
-        What_is_your_Gender AS Gender,
-        Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Gender, Awareness;
-""", conn)
-
-conn.close()
-
-# Step 5: Plot Charts
-os.makedirs("charts", exist_ok=True)
+gender_awareness_df = df.groupby(['What_is_your_Gender',
+                                  'Are_you_aware_of_what_constitutes_workplace_harassment'], dropna=False, observed=True).size().reset_index(name='Count')
+gender_awareness_df.columns = ['Gender', 'Awareness', 'Count']
+gender_awareness_df = nulls_first(gender_awareness_df)
 
-# Plot 1: Overall Awareness
-plt.figure(figsize=(6, 4))
-sns.barplot(data=awareness_df, x='Awareness', y='Count', palette='pastel')
-plt.title("Overall Awareness of Workplace Harassment")
-plt.ylabel("Number of Respondents")
-plt.tight_layout()
-plt.savefig("charts/awareness_chart.png")
-plt.close()
+# Step 3: Plot Charts
+os.makedirs("charts", exist_ok=True)
 
-# Plot 2: Awareness vs Knowledge of Reporting
+# Each chart is an independent PNG render, so they run in a process pool (each on its own Figure, never pyplot)
+def render_one(job):
+    data, kind, path, title, figsize, style = job
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    if kind == 'bar':
+        x, y = data.columns
+        ax.bar(data[x].astype(str), data[y], color=sns.color_palette(style, len(data)))
+        ax.set_xlabel(x)
+    else:
+        data.plot(kind='bar', stacked=True, colormap=style, ax=ax)
+    ax.set_title(title)
+    ax.set_ylabel("Number of Respondents")
+    fig.tight_layout()
+    FigureCanvasAgg(fig).print_png(path)
+    return path
+
+# Plot 1: Overall Awareness; Plots 2-4: Awareness/Training vs Reporting and Gender-based Awareness
 pivot1 = awareness_reporting_df.pivot(index='Awareness', columns='Know_Whom_To_Report', values='Count').fillna(0)
-pivot1.plot(kind='bar', stacked=True, colormap='coolwarm', figsize=(8, 5))
-plt.title("Awareness vs Knowledge of Reporting")
-plt.ylabel("Number of Respondents")
-plt.tight_layout()
-plt.savefig("charts/awareness_vs_reporting.png")
-plt.close()
-
-# Plot 3: Training vs Knowledge of Reporting
 pivot2 = training_reporting_df.pivot(index='Training', columns='Know_Whom_To_Report', values='Count').fillna(0)
-pivot2.plot(kind='bar', stacked=True, colormap='viridis', figsize=(8, 5))
-plt.title("Training vs Knowledge of Reporting")
-plt.ylabel("Number of Respondents")
-plt.tight_layout()
-plt.savefig("charts/training_vs_reporting.png")
-plt.close()
-
-# Plot 4: Gender-based Awareness
 pivot3 = gender_awareness_df.pivot(index='Gender', columns='Awareness', values='Count').fillna(0)
-pivot3.plot(kind='bar', stacked=True, colormap='Set2', figsize=(8, 5))
-plt.title("Gender-based Awareness of Workplace Harassment")
-plt.ylabel("Number of Respondents")
-plt.tight_layout()
-plt.savefig("charts/gender_awareness.png")
-plt.close()
-
-# Step 6: Print Conclusive Inferences
+chart_jobs = [
+    (awareness_df, 'bar', "charts/awareness_chart.png", "Overall Awareness of Workplace Harassment", (6, 4), 'pastel'),
+    (pivot1, 'stacked', "charts/awareness_vs_reporting.png", "Awareness vs Knowledge of Reporting", (8, 5), 'coolwarm'),
+    (pivot2, 'stacked', "charts/training_vs_reporting.png", "Training vs Knowledge of Reporting", (8, 5), 'viridis'),
+    (pivot3, 'stacked', "charts/gender_awareness.png", "Gender-based Awareness of Workplace Harassment", (8, 5), 'Set2'),
+]
+with multiprocessing.get_context("fork").Pool(len(chart_jobs)) as pool:
+    pool.map(render_one, chart_jobs)
+
+# Step 4: Print Conclusive Inferences
 print("=== Research-Grade Inferences ===\n")
 
 # Inference 1: Awareness
-total = awareness_df['Count'].sum()
-yes_pct = awareness_df[awareness_df['Awareness'] == 'Yes']['Count'].values[0] / total * 100
+yes_pct = (df['Are_you_aware_of_what_constitutes_workplace_harassment'] == 'Yes').mean() * 100
 print(f"1. Awareness of Harassment: {yes_pct:.1f}% of respondents are fully aware of what constitutes workplace harassment.\n"
       "   ➤ This high level of awareness provides a strong base for assessing policy effectiveness.\n")
 
@@ -1,76 +1,58 @@
-import pandas as pd
-import sqlite3
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import os
+from survey_load import get_df, nulls_first, tiny_html
 
 # Set up paths
 EXCEL_FILE = "data.xlsx"
-DB_FILE = "harassment_survey.db"
 CHART_DIR = "charts"
 REPORT_FILE = "harassment_policy_report.html"
+TEMPLATE_DIR = "templates"
+JINJA_CACHE_DIR = ".jinja_cache"
 
 # Create charts folder
 os.makedirs(CHART_DIR, exist_ok=True)
 
-# Load Excel and clean column names
-df = pd.read_excel(EXCEL_FILE)
-df.columns = [col.strip().replace(" ", "_").replace("?", "").replace(",", "").replace("(", "").replace(")", "").replace("/", "_") for col in df.columns]
+# Load Excel with cleaned column names
+df = get_df(EXCEL_FILE)
 
-# Save to SQLite
-conn = sqlite3.connect(DB_FILE)
-df.to_sql("survey", conn, if_exists="replace", index=False)
+# Aggregate responses
+awareness_df = df.groupby('Are_you_aware_of_what_constitutes_workplace_harassment', dropna=False, observed=True).size().reset_index(name='Count')
+awareness_df.columns = ['Awareness', 'Count']
+awareness_df = nulls_first(awareness_df)
 
-# Run Queries
-awareness_df = pd.read_sql_query("""
-    SELECT Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness, COUNT(*) AS Count
-    FROM survey
-    GROUP BY Awareness;
-""", conn)
+awareness_reporting_df = df.groupby(['Are_you_aware_of_what_constitutes_workplace_harassment',
+                                     'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+awareness_reporting_df.columns = ['Awareness', 'Know_Whom_To_Report', 'Count']
+awareness_reporting_df = nulls_first(awareness_reporting_df)
 
-awareness_reporting_df = pd.read_sql_query("""
-    SELECT 
-        Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-        Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom_To_Report,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Awareness, Know_Whom_To_Report;
-""", conn)
+training_reporting_df = df.groupby(['Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
+                                    'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+training_reporting_df.columns = ['Training', 'Know_Whom_To_Report', 'Count']
+training_reporting_df = nulls_first(training_reporting_df)
 
-training_reporting_df = pd.read_sql_query("""
-    SELECT 
-        Have_you_ever_received_any_formal_training_on_workplace_harassment_policies AS Training,
-        Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom_To_Report,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Training, Know_Whom_To_Report;
-""", conn)
-
-gender_awareness_df = pd.read_sql_query("""
-    SELECT 
-        What_is_your_Gender AS Gender,
-        Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-        COUNT(*) AS Count
-    FROM survey
-    GROUP BY Gender, Awareness;
-""", conn)
-
-conn.close()
+gender_awareness_df = df.groupby(['What_is_your_Gender',
+                                  'Are_you_aware_of_what_constitutes_workplace_harassment'], dropna=False, observed=True).size().reset_index(name='Count')
+gender_awareness_df.columns = ['Gender', 'Awareness', 'Count']
+gender_awareness_df = nulls_first(gender_awareness_df)
 
 # Plot Charts
 def save_chart(data, x, y, title, filename, kind='bar', stacked=False, pivot=False, index=None, columns=None):
-    plt.figure(figsize=(8, 5))
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
     if pivot:
         data = data.pivot(index=index, columns=columns, values=y).fillna(0)
-        data.plot(kind=kind, stacked=stacked)
+        data.plot(kind=kind, stacked=stacked, ax=ax)
     else:
-        sns.barplot(data=data, x=x, y=y, palette='Set2')
-    plt.title(title)
-    plt.tight_layout()
+        ax.bar(data[x].astype(str), data[y], color=sns.color_palette('Set2', len(data)))
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+    ax.set_title(title)
+    fig.tight_layout()
     path = os.path.join(CHART_DIR, filename)
-    plt.savefig(path)
-    plt.close()
+    FigureCanvasAgg(fig).print_png(path)
     return path
 
 # Save chart images
@@ -82,63 +64,26 @@ chart_paths = {
 }
 
 # Prepare data for template
-total = awareness_df['Count'].sum()
-yes_pct = awareness_df[awareness_df['Awareness'] == 'Yes']['Count'].values[0] / total * 100
+yes_pct = (df['Are_you_aware_of_what_constitutes_workplace_harassment'] == 'Yes').mean() * 100
 
 template_data = {
     "awareness_pct": f"{yes_pct:.1f}",
-    "awareness_data": awareness_df.to_html(index=False),
-    "awareness_vs_reporting": awareness_reporting_df.to_html(index=False),
-    "training_vs_reporting": training_reporting_df.to_html(index=False),
-    "gender_awareness": gender_awareness_df.to_html(index=False),
+    "awareness_data": tiny_html(awareness_df),
+    "awareness_vs_reporting": tiny_html(awareness_reporting_df),
+    "training_vs_reporting": tiny_html(training_reporting_df),
+    "gender_awareness": tiny_html(gender_awareness_df),
     "charts": chart_paths
 }
 
-# Jinja2 HTML Template Rendering
-html_template = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Workplace Harassment Policy Report</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 40px; }
-        h1 { color: #333; }
-        h2 { margin-top: 40px; }
-        img { max-width: 100%; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; }
-        th, td { padding: 8px; border: 1px solid #ccc; text-align: left; }
-    </style>
-</head>
-<body>
-    <h1>Survey Report: Awareness and Effectiveness of Workplace Harassment Policies</h1>
-
-    <h2>1. Awareness of Workplace Harassment</h2>
-    <p><strong>{{ awareness_pct }}%</strong> of respondents reported full awareness.</p>
-    <img src="{{ charts.awareness }}" alt="Awareness Chart">
-    {{ awareness_data|safe }}
-
-    <h2>2. Awareness vs Knowledge of Reporting</h2>
-    <img src="{{ charts.awareness_vs_reporting }}" alt="Awareness vs Reporting Chart">
-    {{ awareness_vs_reporting|safe }}
-
-    <h2>3. Formal Training vs Reporting Knowledge</h2>
-    <img src="{{ charts.training_vs_reporting }}" alt="Training vs Reporting Chart">
-    {{ training_vs_reporting|safe }}
-
-    <h2>4. Gender-based Awareness</h2>
-    <img src="{{ charts.gender_awareness }}" alt="Gender Awareness Chart">
-    {{ gender_awareness|safe }}
-
-    <p><em>All visualizations and conclusions are based on sample survey data.</em></p>
-</body>
-</html>
-"""
-
-# Write the HTML file
-env = Environment()
-template = env.from_string(html_template)
+# Jinja2 HTML Template Rendering (compiled templates are cached on disk between runs)
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+env = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                  bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+                  auto_reload=False)
+template = env.get_template("harassment_policy_report.html.j2")
 html_output = template.render(**template_data)
 
+# Write the HTML file
 with open(REPORT_FILE, "w", encoding="utf-8") as f:
     f.write(html_output)
 
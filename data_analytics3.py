@@ -1,89 +1,73 @@
-import pandas as pd
-import sqlite3
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import os
-import base64
+import sys
+from urllib.parse import quote
+from survey_load import get_df, nulls_first, tiny_html, write_html_with_embedded_file
 
 # -----------------------------
 # CONFIGURATION
 # -----------------------------
 EXCEL_FILE = "Awareness and Effectiveness of Workplace Harassment Policies in the Private Sector  (Responses).xlsx"
-DB_FILE = "harassment_survey.db"
 CHART_DIR = "charts"
 REPORT_FILE = "enhanced_harassment_policy_report.html"
-EMBED_FILE_NAME = "survey_data.xlsx"
+TEMPLATE_DIR = "templates"
+JINJA_CACHE_DIR = ".jinja_cache"
+EMBED_PLACEHOLDER = "__ENCODED_EXCEL__"
+# --standalone embeds the workbook as a base64 data URI; by default the report links to it on disk
+STANDALONE = "--standalone" in sys.argv[1:]
 
 # -----------------------------
 # LOAD AND CLEAN DATA
 # -----------------------------
-df = pd.read_excel(EXCEL_FILE)
-df.columns = [col.strip().replace(" ", "_").replace("?", "").replace(",", "").replace("(", "").replace(")", "").replace("/", "_") for col in df.columns]
-
-# Save cleaned Excel to embed
-df.to_excel(EMBED_FILE_NAME, index=False)
-
-# Convert Excel file to base64 for embedding
-with open(EMBED_FILE_NAME, "rb") as f:
-    encoded_excel = base64.b64encode(f.read()).decode("utf-8")
+df = get_df(EXCEL_FILE)
 
 # Create charts directory
 os.makedirs(CHART_DIR, exist_ok=True)
 
 # -----------------------------
-# SAVE TO SQLITE
+# AGGREGATIONS
 # -----------------------------
-conn = sqlite3.connect(DB_FILE)
-df.to_sql("survey", conn, if_exists="replace", index=False)
+awareness_df = df.groupby('Are_you_aware_of_what_constitutes_workplace_harassment', dropna=False, observed=True).size().reset_index(name='Count')
+awareness_df.columns = ['Awareness', 'Count']
+awareness_df = nulls_first(awareness_df)
 
-# -----------------------------
-# QUERIES
-# -----------------------------
-awareness_df = pd.read_sql_query("""
-    SELECT Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness, COUNT(*) AS Count
-    FROM survey GROUP BY Awareness;
-""", conn)
-
-awareness_reporting_df = pd.read_sql_query("""
-    SELECT Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-           Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom,
-           COUNT(*) AS Count
-    FROM survey GROUP BY Awareness, Know_Whom;
-""", conn)
-
-training_reporting_df = pd.read_sql_query("""
-    SELECT Have_you_ever_received_any_formal_training_on_workplace_harassment_policies AS Training,
-           Do_you_know_whom_to_report_workplace_harassment_incidents_to AS Know_Whom,
-           COUNT(*) AS Count
-    FROM survey GROUP BY Training, Know_Whom;
-""", conn)
-
-gender_awareness_df = pd.read_sql_query("""
-    SELECT What_is_your_Gender AS Gender,
-           Are_you_aware_of_what_constitutes_workplace_harassment AS Awareness,
-           COUNT(*) AS Count
-    FROM survey GROUP BY Gender, Awareness;
-""", conn)
-
-conn.close()
+awareness_reporting_df = df.groupby(['Are_you_aware_of_what_constitutes_workplace_harassment',
+                                     'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+awareness_reporting_df.columns = ['Awareness', 'Know_Whom', 'Count']
+awareness_reporting_df = nulls_first(awareness_reporting_df)
+
+training_reporting_df = df.groupby(['Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
+                                    'Do_you_know_whom_to_report_workplace_harassment_incidents_to'], dropna=False, observed=True).size().reset_index(name='Count')
+training_reporting_df.columns = ['Training', 'Know_Whom', 'Count']
+training_reporting_df = nulls_first(training_reporting_df)
+
+gender_awareness_df = df.groupby(['What_is_your_Gender',
+                                  'Are_you_aware_of_what_constitutes_workplace_harassment'], dropna=False, observed=True).size().reset_index(name='Count')
+gender_awareness_df.columns = ['Gender', 'Awareness', 'Count']
+gender_awareness_df = nulls_first(gender_awareness_df)
 
 # -----------------------------
 # VISUALIZATION FUNCTIONS
 # -----------------------------
 def save_chart(data, title, filename, kind='bar', pivot=False, index=None, columns=None, y='Count', palette='Set2', stacked=False):
-    plt.figure(figsize=(8, 5))
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
     if pivot:
         data = data.pivot(index=index, columns=columns, values=y).fillna(0)
-        data.plot(kind=kind, stacked=stacked)
+        data.plot(kind=kind, stacked=stacked, ax=ax)
     else:
-        sns.barplot(data=data, x=data.columns[0], y=y, palette=palette)
-    plt.title(title)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+        x = data.columns[0]
+        ax.bar(data[x].astype(str), data[y], color=sns.color_palette(palette, len(data)))
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+    ax.set_title(title)
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
     path = os.path.join(CHART_DIR, filename)
-    plt.savefig(path)
-    plt.close()
+    FigureCanvasAgg(fig).print_png(path)
     return path
 
 # Save all charts
@@ -97,9 +81,8 @@ chart_paths = {
 # -----------------------------
 # GENERATE INTERPRETATIONS
 # -----------------------------
-total = awareness_df['Count'].sum()
-yes_count = awareness_df[awareness_df['Awareness'] == 'Yes']['Count'].values[0]
-yes_pct = yes_count / total * 100
+total = len(df)
+yes_pct = (df['Are_you_aware_of_what_constitutes_workplace_harassment'] == 'Yes').mean() * 100
 
 summary = f"""
 <strong>Executive Summary:</strong><br>
@@ -109,78 +92,28 @@ Out of {total} respondents, <strong>{yes_pct:.1f}%</strong> reported being fully
 # -----------------------------
 # BUILD HTML REPORT
 # -----------------------------
-html_template = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Enhanced Workplace Harassment Survey Report</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 40px; background-color: #f9f9f9; }
-        h1, h2 { color: #2c3e50; }
-        h2 { margin-top: 40px; }
-        img { max-width: 100%; border: 1px solid #ccc; padding: 4px; background: #fff; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; background: white; }
-        th, td { padding: 8px; border: 1px solid #ccc; text-align: left; }
-        .chart { margin: 30px 0; }
-        .section { background: #fff; padding: 20px; border-radius: 6px; box-shadow: 0 0 10px #ccc; margin-bottom: 30px; }
-    </style>
-</head>
-<body>
-    <h1>Survey Report: Awareness and Effectiveness of Workplace Harassment Policies</h1>
-    
-    <div class="section">
-        <h2>1. Executive Summary</h2>
-        <p>{{ summary|safe }}</p>
-    </div>
-
-    <div class="section">
-        <h2>2. Overall Awareness</h2>
-        <img src="{{ charts.awareness }}" alt="Awareness Chart">
-        {{ awareness_df|safe }}
-    </div>
-
-    <div class="section">
-        <h2>3. Awareness vs Reporting Knowledge</h2>
-        <img src="{{ charts.awareness_vs_reporting }}" alt="Awareness vs Reporting Chart">
-        {{ awareness_reporting_df|safe }}
-    </div>
-
-    <div class="section">
-        <h2>4. Formal Training vs Reporting Knowledge</h2>
-        <img src="{{ charts.training_vs_reporting }}" alt="Training vs Reporting Chart">
-        {{ training_reporting_df|safe }}
-    </div>
-
-    <div class="section">
-        <h2>5. Gender-based Awareness</h2>
-        <img src="{{ charts.gender_awareness }}" alt="Gender Awareness Chart">
-        {{ gender_awareness_df|safe }}
-    </div>
-
-    <div class="section">
-        <h2>6. Original Survey Dataset</h2>
-        <p>You can download the original Excel file used in this report below:</p>
-        <a download="SurveyData.xlsx" href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{{ encoded_excel }}">Download Excel File</a>
-    </div>
-</body>
-</html>
-"""
-
-env = Environment()
-template = env.from_string(html_template)
+# Compiled template bytecode is cached on disk so re-runs skip Jinja's compile step
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+env = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                  bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+                  auto_reload=False)
+template = env.get_template("enhanced_harassment_policy_report.html.j2")
 
 html_output = template.render(
     summary=summary,
-    awareness_df=awareness_df.to_html(index=False),
-    awareness_reporting_df=awareness_reporting_df.to_html(index=False),
-    training_reporting_df=training_reporting_df.to_html(index=False),
-    gender_awareness_df=gender_awareness_df.to_html(index=False),
+    awareness_df=tiny_html(awareness_df),
+    awareness_reporting_df=tiny_html(awareness_reporting_df),
+    training_reporting_df=tiny_html(training_reporting_df),
+    gender_awareness_df=tiny_html(gender_awareness_df),
     charts=chart_paths,
-    encoded_excel=encoded_excel
+    dataset_href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64," + EMBED_PLACEHOLDER if STANDALONE else quote(EXCEL_FILE)
 )
 
-with open(REPORT_FILE, "w", encoding="utf-8") as f:
-    f.write(html_output)
+if STANDALONE:
+    write_html_with_embedded_file(REPORT_FILE, html_output, EMBED_PLACEHOLDER, EXCEL_FILE)
+else:
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        f.write(html_output)
 
 print(f"✅ Enhanced report generated: {REPORT_FILE}")
 
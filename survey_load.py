@@ -0,0 +1,73 @@
+import base64
+import pandas as pd
+from html import escape
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    from pyarrow import ArrowException
+except ImportError:
+    # Without pyarrow the parquet calls raise ImportError, which is caught alongside it below
+    ArrowException = ImportError
+
+# Low-cardinality answer columns that every script groups by; categorical codes make the groupbys integer-keyed
+CATEGORICAL_COLUMNS = [
+    'Are_you_aware_of_what_constitutes_workplace_harassment',
+    'Do_you_know_whom_to_report_workplace_harassment_incidents_to',
+    'Have_you_ever_received_any_formal_training_on_workplace_harassment_policies',
+    'What_is_your_Gender',
+]
+
+
+# Load a survey workbook and clean its column names, reusing a Parquet copy of the raw sheet
+# while it is newer than the workbook. Memoized so scripts run in one interpreter parse it once;
+# the returned DataFrame is shared between callers and must not be modified in place.
+@lru_cache(maxsize=1)
+def get_df(path="data.xlsx"):
+    cache = Path(path).with_suffix(".parquet")
+    df = None
+    if cache.exists() and cache.stat().st_mtime >= Path(path).stat().st_mtime:
+        try:
+            df = pd.read_parquet(cache)
+        except (ImportError, OSError, ArrowException):
+            df = None
+    if df is None:
+        df = pd.read_excel(path, engine="calamine")
+        # The cache is only a speed-up: mixed-type columns, a missing pyarrow or a read-only
+        # directory just mean the workbook is parsed again next run
+        try:
+            df.to_parquet(cache, index=False)
+        except (ImportError, OSError, ArrowException):
+            pass
+    df.columns = df.columns.str.strip().str.replace(r"[?,()]", "", regex=True).str.replace(r"[ /]", "_", regex=True)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
+
+
+# Plain <table> markup for the few-row count tables in the reports, skipping DataFrame.to_html's
+# formatter; missing answers are left as empty cells
+def tiny_html(data):
+    head = "".join(f"<th>{escape(str(c))}</th>" for c in data.columns)
+    rows = "".join("<tr>" + "".join(f"<td>{'' if pd.isna(v) else escape(str(v))}</td>" for v in row) + "</tr>"
+                   for row in data.itertuples(index=False))
+    return f"<table><tr>{head}</tr>{rows}</table>"
+
+
+# Write html to out_path with the placeholder replaced by embed_path's contents as base64. The file is
+# encoded in 57 KiB reads (a multiple of 3 bytes, so padding only appears at the end) straight into the
+# output, rather than holding the raw and encoded bytes in memory together.
+def write_html_with_embedded_file(out_path, html, placeholder, embed_path):
+    head, tail = html.split(placeholder)
+    with open(out_path, "w", encoding="utf-8") as out, open(embed_path, "rb") as f:
+        out.write(head)
+        while chunk := f.read(57 * 1024):
+            out.write(base64.b64encode(chunk).decode("ascii"))
+        out.write(tail)
+
+
+# Reorder group counts the way SQLite's GROUP BY did (missing answers first within each key);
+# pandas sorts the NaN group last
+def nulls_first(counts):
+    keys = list(counts.columns.drop('Count'))
+    return counts.sort_values(keys, na_position='first', ignore_index=True)